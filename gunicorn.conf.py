@@ -0,0 +1,48 @@
+"""
+gunicorn 配置：gevent worker，多进程部署签名服务
+每个 worker 进程各自启动 chromium 和签名上下文池
+
+使用方法:
+    gunicorn -c gunicorn.conf.py sign_server:application
+
+环境变量:
+    PORT - 监听端口（默认 5005）
+    WEB_CONCURRENCY - worker 进程数（默认 1）
+    POOL_SIZE - 每个 worker 的签名上下文数（默认 2）
+    XHS_A1 - 所有 worker 共用的 a1（worker 数大于 1 时必须设置）
+"""
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5005)}"
+worker_class = "gevent"
+# 每个 worker 都会启动一个 chromium，默认只开一个，需要多进程时显式设置 WEB_CONCURRENCY
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# 每个 worker 的浏览器会各自生成 a1，客户端从一个 worker 取 a1、到另一个 worker 签名就会失败
+if workers > 1 and not os.environ.get('XHS_A1'):
+    raise RuntimeError("WEB_CONCURRENCY > 1 时必须设置 XHS_A1，保证所有 worker 使用同一个 a1")
+
+# gevent worker 在 init_browser() 返回前不会发心跳，超时需覆盖整个启动过程：
+# 下载 stealth.js（≤13 秒）+ 主上下文（goto ≤30 秒 + 等待签名函数 ≤10 秒 + 等待 a1 ≤5 秒）
+# + 其余上下文并发预热（≤40 秒，与 POOL_SIZE 无关），默认 30 秒太短
+timeout = 120
+
+
+def post_worker_init(worker):
+    """worker 加载完应用后初始化各自的浏览器"""
+    import sign_server
+    
+    try:
+        sign_server.init_browser()
+    except Exception as e:
+        # 不以降级模式继续运行：以普通退出码结束 worker，由 arbiter 重新拉起一个全新的 worker
+        # （未捕获的异常会被当作 boot 失败，导致整个 gunicorn 退出）
+        worker.log.error(f"浏览器初始化失败，worker 退出等待重启: {e}")
+        sys.exit(1)
+
+
+def worker_exit(server, worker):
+    """worker 退出时关闭浏览器"""
+    import sign_server
+    sign_server.close_browser()
@@ -5,6 +5,7 @@
 
 使用方法:
     python sign_server.py
+    gunicorn -c gunicorn.conf.py sign_server:application  # 多进程部署
 
 环境要求:
     pip install flask playwright gevent
@@ -12,6 +13,7 @@
 
 API 端点:
     POST /sign - 获取签名
+    POST /sign_batch - 批量获取签名
     GET /a1 - 获取当前 a1 值
     GET /health - 健康检查
 """
@@ -22,43 +24,222 @@ monkey.patch_all()
 
 import time
 import logging
+import atexit
 import sys
 import os
-from flask import Flask, request, jsonify
+import json
+import hashlib
+import random
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from http import HTTPStatus
+import gevent
+import orjson
+from flask import Flask
 from playwright.sync_api import sync_playwright
 from gevent import pywsgi
-import requests
+from gevent.queue import Queue
+from gevent.lock import Semaphore
+from gevent.event import AsyncResult
+from cachetools import TTLCache
+from geventhttpclient import HTTPClient
+from geventhttpclient.url import URL
 
-# 配置日志
+
+class NativeThreadQueueListener(QueueListener):
+    """
+    在原生线程中消费日志队列并写 stdout
+    monkey.patch_all 之后 threading.Thread 实际是 greenlet，写 stdout 仍会阻塞整个进程，
+    因此改用 gevent 线程池里的原生线程
+    """
+    
+    def start(self):
+        self._thread = gevent.get_hub().threadpool.spawn(self._monitor)
+    
+    def stop(self):
+        if self._thread is not None:
+            self.enqueue_sentinel()
+            self._thread.get()
+            self._thread = None
+
+
+# 配置日志：请求路径上只把日志放入队列，由后台原生线程写 stdout
+# 使用未被 patch 的 SimpleQueue，才能在原生线程和 greenlet 之间安全传递
+log_queue = monkey.get_original('queue', 'SimpleQueue')()
+log_handler = QueueHandler(log_queue)
+log_handler.setFormatter(logging.Formatter())  # 只合并 message（含异常堆栈），完整格式交给 stdout handler
+stdout_handler = logging.StreamHandler(sys.stdout)
+stdout_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.StreamHandler(sys.stdout)
+        log_handler
     ]
 )
+log_listener = NativeThreadQueueListener(log_queue, stdout_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+
+def ojsonify(obj, status=200):
+    """使用 orjson 序列化响应（C 实现，比 flask.jsonify 更快）"""
+    return app.response_class(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+# 签名页面池大小（可通过环境变量 POOL_SIZE 调大）
+# 所有上下文共享同一个 chromium 进程，但每个上下文都常驻一个小红书页面，
+# 默认值保持很小，避免在 Render free plan（512 MB）这类小内存实例上 OOM；
+# 容器内 os.cpu_count() 返回的是宿主机核数，不能用来推算默认值
+POOL_SIZE = max(1, int(os.environ.get('POOL_SIZE', 2)))
+
+# chromium 启动参数：签名只需要执行页面 JS，关闭 GPU、扩展、后台网络、翻译等无关功能，
+# 降低每个上下文的创建开销和常驻内存；多 worker 部署时每个进程各自启动一个 chromium
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--no-zygote',
+    '--disable-gpu',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-features=TranslateUI,BlinkGenPropertyTrees,IsolateOrigins,site-per-process',
+    '--mute-audio',
+]
+
+# 签名只依赖页面 JS，图片、视频、字体、样式表一律不加载
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+# 等待页面挂载 window._webmsxyw 的超时（毫秒）
+SIGN_FUNCTION_WAIT_TIMEOUT = 10000
+
+# 签名函数就绪后，a1 cookie 可能还没写入，轮询等待的上限和间隔（秒）
+A1_COOKIE_WAIT_TIMEOUT = 5
+A1_COOKIE_POLL_INTERVAL = 0.1
+
+# 固定 a1（可选）：多 worker 部署时每个进程的浏览器会各自生成 a1，
+# 设置 XHS_A1 后所有 worker 使用同一个 a1，客户端只需配置一次
+XHS_A1 = os.environ.get('XHS_A1', '')
+
 # 全局变量
 playwright_instance = None
-browser_context = None
-context_page = None
+browser = None
+browser_context = None  # 主上下文（a1 cookie 从这里读取）
+page_pool = None  # 预热好的 (BrowserContext, Page) 池，每个签名请求借出一个
+sign_contexts = []  # 池中所有 BrowserContext（a1 轮换时逐个同步 cookie）
 global_a1 = ""  # 当前浏览器中的 a1 值
+a1_refresher = None  # 定期刷新 a1 的后台 greenlet
+browser_init_lock = Semaphore()  # 防止并发请求重复初始化浏览器
+
+# a1 刷新间隔（秒），小红书轮换 a1 后可以及时感知，而不是等签名重试失败
+A1_REFRESH_INTERVAL = float(os.environ.get('A1_REFRESH_INTERVAL', 300))
+
+# 签名结果缓存：相同 (uri, data) 在短时间内签名结果一致，命中时直接返回，不再进入浏览器
+# x-t 是时间戳，TTL 不能超过小红书服务端对时间戳的容忍范围
+SIGN_CACHE_TTL = float(os.environ.get('SIGN_CACHE_TTL', 150))
+SIGN_CACHE_MAXSIZE = int(os.environ.get('SIGN_CACHE_MAXSIZE', 4096))
+sign_cache = TTLCache(maxsize=SIGN_CACHE_MAXSIZE, ttl=SIGN_CACHE_TTL)
+sign_cache_lock = Semaphore()
+# a1 轮换代数：a1 变化时加一，按旧 a1 生成、轮换后才完成的签名不再写入缓存
+a1_generation = 0
+
+# single-flight：缓存未命中时，相同 (uri, data) 的并发请求只有第一个进入浏览器，其余等待它的结果
+# 与 sign_cache 共用 sign_cache_lock
+SIGN_IN_FLIGHT_TIMEOUT = 60
+sign_in_flight = {}  # (a1 代数, 缓存键) -> AsyncResult
+
+# 签名重试：指数退避 + 随机抖动，避免上游恢复时所有请求同时重试
+SIGN_MAX_ATTEMPTS = 10
+SIGN_RETRY_BASE_DELAY = 0.05
+SIGN_RETRY_MAX_DELAY = 2.0
+
+# 签名脚本：固定为同一个源码字符串，V8 会命中编译缓存，不必每次重新解析
+# 在页面内统一 x-s/x-t 的大小写并转成字符串，只回传需要的两个字段；
+# 返回值不是对象时直接抛错，走正常的重试流程
+SIGN_SCRIPT = """([url, data]) => {
+    const r = window._webmsxyw(url, data);
+    if (!r || typeof r !== 'object') throw new Error('签名函数返回值不是字典: ' + typeof r);
+    return {'x-s': r['X-s'] || r['x-s'] || '', 'x-t': String(r['X-t'] || r['x-t'] || '')};
+}"""
+# 批量签名：一次 evaluate 计算多条签名，复用同一个单条签名函数
+SIGN_BATCH_SCRIPT = f"(items) => items.map({SIGN_SCRIPT})"
+SIGN_BATCH_MAX_ITEMS = int(os.environ.get('SIGN_BATCH_MAX_ITEMS', 100))
+
+# 下载 stealth.min.js 的超时：连接 3 秒（死掉的源快速失败），读取 10 秒
+HTTP_CONNECT_TIMEOUT = 3
+HTTP_READ_TIMEOUT = 10
+
+# 请求错误日志限流：相同错误每秒最多记录 ERROR_LOG_RATE_LIMIT 条，上游故障时避免日志风暴
+ERROR_LOG_RATE_LIMIT = 10
+ERROR_LOG_MAX_KEYS = 1024
+error_log_history = {}  # (错误类型, 错误信息) -> 最近若干次记录的时间戳
+
+
+def sign_cache_key(uri, data):
+    """根据 uri 和规范化后的 data 生成缓存键"""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(uri.encode() + b"\0" + canonical.encode()).digest()
+
+
+def is_cacheable_sign(result):
+    """x-s、x-t 都非空的签名结果才写入缓存，避免一次偶发的失败签名被反复返回"""
+    return bool(result["x-s"]) and bool(result["x-t"])
+
+
+def log_request_error(prefix, e):
+    """记录请求处理失败（不格式化 traceback），相同错误超过限流阈值时直接丢弃"""
+    error_type = type(e).__name__
+    error_msg = str(e)[:200]
+    key = (error_type, error_msg)
+    now = time.monotonic()
+    
+    history = error_log_history.get(key)
+    if history is None:
+        if len(error_log_history) >= ERROR_LOG_MAX_KEYS:
+            error_log_history.clear()
+        history = error_log_history[key] = deque(maxlen=ERROR_LOG_RATE_LIMIT)
+    elif len(history) == history.maxlen and now - history[0] < 1.0:
+        return
+    
+    history.append(now)
+    logger.error("%s: %s: %s", prefix, error_type, error_msg)
+
+
+def fetch_stealth_js(url):
+    """从单个下载源获取 stealth.min.js 内容，失败时抛出异常"""
+    url = URL(url)
+    client = HTTPClient.from_url(url, connection_timeout=HTTP_CONNECT_TIMEOUT, network_timeout=HTTP_READ_TIMEOUT)
+    try:
+        response = client.get(url.request_uri)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        content = response.read().decode('utf-8')
+    finally:
+        client.close()
+    
+    # 验证下载内容
+    if len(content) < 100:
+        raise Exception(f"下载的文件太小，可能不是有效的脚本: {len(content)} bytes")
+    
+    return content
 
 
 def download_stealth_js():
     """
-    自动下载 stealth.min.js 到本地
+    自动下载 stealth.min.js 到本地，并返回脚本内容
+    内容只读取一次，池中所有上下文共用同一份字符串
     参考：https://github.com/requireCool/stealth.min.js
     """
     stealth_js_path = "stealth.min.js"
     
-    # 如果文件已存在，直接返回
+    # 如果文件已存在，直接读取
     if os.path.exists(stealth_js_path):
         logger.info(f"✅ stealth.min.js 已存在")
-        return stealth_js_path
+        with open(stealth_js_path, 'r', encoding='utf-8') as f:
+            return f.read()
     
     # 多个备用下载源
     cdn_urls = [
@@ -67,30 +248,32 @@ def download_stealth_js():
         "https://raw.githubusercontent.com/requireCool/stealth.min.js/main/stealth.min.js",
     ]
     
-    for idx, url in enumerate(cdn_urls):
-        try:
-            logger.info(f"正在从源 {idx + 1}/{len(cdn_urls)} 下载 stealth.min.js...")
-            logger.info(f"URL: {url}")
-            
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # 验证下载内容
-            if len(response.text) < 100:
-                logger.warning(f"下载的文件太小，可能不是有效的脚本: {len(response.text)} bytes")
-                continue
-            
-            with open(stealth_js_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            
-            logger.info(f"✅ stealth.min.js 下载成功 ({len(response.text)} bytes)")
-            return stealth_js_path
-            
-        except Exception as e:
-            logger.warning(f"从源 {idx + 1} 下载失败: {e}")
-            if idx < len(cdn_urls) - 1:
-                logger.info(f"尝试下一个下载源...")
-            continue
+    # 所有下载源并发请求，取最先成功的一个，其余直接取消
+    logger.info(f"正在从 {len(cdn_urls)} 个源并发下载 stealth.min.js...")
+    jobs = {gevent.spawn(fetch_stealth_js, url): idx for idx, url in enumerate(cdn_urls)}
+    pending = list(jobs)
+    content = None
+    
+    while pending and content is None:
+        for job in gevent.wait(pending, count=1):
+            pending.remove(job)
+            if job.successful():
+                content = job.value
+                logger.info(f"✅ 源 {jobs[job] + 1} 下载完成: {cdn_urls[jobs[job]]}")
+                break
+            logger.warning(f"从源 {jobs[job] + 1} 下载失败: {job.exception}")
+    
+    gevent.killall(pending, block=False)
+    
+    if content is not None:
+        # 多个 worker 可能同时下载：先写临时文件再原子替换，其他 worker 不会读到写了一半的文件
+        tmp_path = f"{stealth_js_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, stealth_js_path)
+        
+        logger.info(f"✅ stealth.min.js 下载成功 ({len(content)} bytes)")
+        return content
     
     logger.error(f"❌ 所有下载源都失败了")
     logger.warning(f"💡 提示: 您可以手动下载 stealth.min.js 文件到当前目录")
@@ -98,12 +281,93 @@ def download_stealth_js():
     return None
 
 
+def block_unneeded_resources(route):
+    """拦截签名用不到的子资源，加快首页加载"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+def create_sign_context(browser, stealth_js, cookies=None):
+    """
+    创建一个预热好的签名上下文（BrowserContext + Page）
+
+    传入 cookies 时会在访问首页前写入，保证池中所有上下文使用同一个 a1
+    失败时关闭已创建的上下文再抛出异常，不会泄漏页面
+    """
+    context = browser.new_context()
+    try:
+        context.route("**/*", block_unneeded_resources)
+        
+        # 加载反检测脚本（重要！）
+        if stealth_js:
+            context.add_init_script(script=stealth_js)
+        
+        if cookies:
+            context.add_cookies(cookies)
+        
+        page = context.new_page()
+        
+        # 访问小红书首页（必须先访问首页）
+        page.goto("https://www.xiaohongshu.com")
+        
+        # 官方实现在这里 sleep 1 秒，否则签名函数可能还没挂载、签名获取失败；
+        # 改为轮询等待 window._webmsxyw 就绪，就绪即返回，加载慢时也不会过早开始签名
+        page.wait_for_function("typeof window._webmsxyw === 'function'", timeout=SIGN_FUNCTION_WAIT_TIMEOUT)
+    except Exception:
+        context.close()
+        raise
+    
+    return context, page
+
+
+def wait_for_a1_cookie(context):
+    """
+    轮询等待上下文中出现 a1 cookie，返回当前的 cookie 列表
+    超过 A1_COOKIE_WAIT_TIMEOUT 仍未出现时照常返回，由调用方决定如何处理
+    """
+    deadline = time.monotonic() + A1_COOKIE_WAIT_TIMEOUT
+    while True:
+        cookies = context.cookies()
+        if any(cookie["name"] == "a1" for cookie in cookies) or time.monotonic() >= deadline:
+            return cookies
+        gevent.sleep(A1_COOKIE_POLL_INTERVAL)
+
+
+def refresh_a1_periodically():
+    """
+    后台 greenlet：定期从主上下文重新读取 a1 cookie
+    a1 轮换时同步到池中所有上下文，并清空按旧 a1 生成的签名缓存
+    """
+    global global_a1, a1_generation
+    
+    while True:
+        gevent.sleep(A1_REFRESH_INTERVAL)
+        try:
+            a1_cookie = next((c for c in browser_context.cookies() if c["name"] == "a1"), None)
+            if a1_cookie is None or a1_cookie["value"] == global_a1:
+                continue
+            
+            for context in sign_contexts:
+                if context is not browser_context:
+                    context.add_cookies([a1_cookie])
+            with sign_cache_lock:
+                sign_cache.clear()
+                a1_generation += 1
+            
+            global_a1 = a1_cookie["value"]
+            logger.info(f"🔄 浏览器 a1 已更新并同步到 {len(sign_contexts)} 个签名上下文: {global_a1}")
+        except Exception as e:
+            logger.warning(f"刷新 a1 cookie 失败: {e}")
+
+
 def init_browser():
     """
     初始化浏览器环境
     参考官方实现：https://github.com/ReaJason/xhs
     """
-    global playwright_instance, browser_context, context_page, global_a1
+    global playwright_instance, browser, browser_context, page_pool, sign_contexts, global_a1, a1_refresher
     
     try:
         logger.info("=" * 60)
@@ -111,8 +375,8 @@ def init_browser():
         logger.info("=" * 60)
         
         # 1. 下载 stealth.js（反检测脚本）
-        stealth_js_path = download_stealth_js()
-        if not stealth_js_path:
+        stealth_js = download_stealth_js()
+        if not stealth_js:
             logger.warning("⚠️ stealth.js 下载失败，将在没有反检测脚本的情况下启动")
         
         # 2. 启动 Playwright
@@ -122,30 +386,20 @@ def init_browser():
         
         # 3. 启动浏览器（headless=True，官方推荐）
         logger.info("正在启动 chromium 浏览器（无头模式）...")
-        browser = chromium.launch(headless=True)
+        browser = chromium.launch(headless=True, args=CHROMIUM_ARGS)
         
-        # 4. 创建浏览器上下文
-        browser_context = browser.new_context()
-        
-        # 5. 加载反检测脚本（重要！）
-        if stealth_js_path:
-            browser_context.add_init_script(path=stealth_js_path)
-            logger.info("✅ stealth.min.js 反检测脚本已加载")
-        
-        # 6. 创建页面
-        context_page = browser_context.new_page()
-        
-        # 7. 访问小红书首页（必须先访问首页）
+        # 4. 创建主上下文并访问小红书首页（加载反检测脚本，等待页面完全加载）
         logger.info("正在访问小红书首页...")
-        context_page.goto("https://www.xiaohongshu.com")
-        
-        # 8. 这个地方设置完浏览器 cookie 之后，如果这儿不 sleep 一下签名获取就失败了
-        # 如果经常失败请设置长一点试试（官方注释）
-        logger.info("等待页面完全加载（1秒）...")
-        time.sleep(1)
+        pinned_cookies = None
+        if XHS_A1:
+            logger.info(f"使用环境变量 XHS_A1 指定的 a1: {XHS_A1}")
+            pinned_cookies = [{'name': 'a1', 'value': XHS_A1, 'domain': '.xiaohongshu.com', 'path': '/'}]
+        browser_context, main_page = create_sign_context(browser, stealth_js, pinned_cookies)
+        if stealth_js:
+            logger.info("✅ stealth.min.js 反检测脚本已加载")
         
-        # 9. 提取浏览器生成的 a1 cookie
-        cookies = browser_context.cookies()
+        # 5. 提取浏览器生成的 a1 cookie（签名函数就绪时 cookie 不一定已经写入，需等待）
+        cookies = wait_for_a1_cookie(browser_context)
         for cookie in cookies:
             if cookie["name"] == "a1":
                 global_a1 = cookie["value"]
@@ -156,155 +410,299 @@ def init_browser():
         if not global_a1:
             logger.warning("⚠️ 未能获取到 a1 cookie，签名可能会失败")
         
+        # 6. 并发预热其余签名上下文（复制主上下文的 cookie，共享同一个 a1）
+        # 启动耗时与 POOL_SIZE 无关，不会因为串行预热超过 gunicorn 的 worker 超时；
+        # 主上下文已就绪，个别上下文预热失败只记录日志，池子缩小后照常服务
+        if POOL_SIZE > 1:
+            logger.info(f"正在并发预热其余 {POOL_SIZE - 1} 个签名上下文...")
+        jobs = [gevent.spawn(create_sign_context, browser, stealth_js, cookies) for _ in range(1, POOL_SIZE)]
+        gevent.joinall(jobs)
+        
+        pool = Queue()
+        contexts = [browser_context]
+        pool.put((browser_context, main_page))
+        for idx, job in enumerate(jobs):
+            if not job.successful():
+                logger.warning(f"⚠️ 签名上下文 {idx + 2}/{POOL_SIZE} 预热失败，已跳过: {job.exception}")
+                continue
+            context, page = job.value
+            contexts.append(context)
+            pool.put((context, page))
+        sign_contexts = contexts
+        page_pool = pool
+        logger.info(f"✅ 签名上下文池已就绪（{len(contexts)}/{POOL_SIZE} 个）")
+        
+        # 7. 启动 a1 定期刷新（不占用签名请求的关键路径）
+        # 通过 XHS_A1 固定 a1 时不刷新，避免覆盖所有 worker 共用的值
+        if not XHS_A1 and (a1_refresher is None or a1_refresher.dead):
+            a1_refresher = gevent.spawn(refresh_a1_periodically)
+        
         logger.info("=" * 60)
         logger.info("✅ 浏览器初始化完成，等待签名请求")
         logger.info("=" * 60)
         
     except Exception as e:
         logger.error(f"❌ 浏览器初始化失败: {e}", exc_info=True)
+        # 停掉已启动的 playwright/chromium 并重置全局状态，否则再次 sync_playwright().start() 会直接报错
+        close_browser()
         raise
 
 
 @app.before_request
 def ensure_browser():
     """确保浏览器已初始化"""
-    global context_page
-    if context_page is None:
-        logger.warning("浏览器未初始化，正在初始化...")
-        init_browser()
+    if page_pool is None:
+        with browser_init_lock:
+            if page_pool is None:
+                logger.warning("浏览器未初始化，正在初始化...")
+                init_browser()
 
 
-def generate_sign(uri, data, a1, web_session, web_id=None):
-    """
-    生成签名（参考官方 basic_usage.py 实现）
-    参考：https://github.com/ReaJason/xhs
+def close_browser():
+    """关闭 playwright（连同 chromium 进程），并重置浏览器相关的全局状态"""
+    global playwright_instance, browser, browser_context, page_pool, sign_contexts, global_a1, a1_refresher
     
-    重要发现：
-    1. 官方签名函数不使用 a1/web_session 参数，签名只依赖 uri 和 data
-    2. 官方建议：签名服务使用固定的 Cookie，不要频繁切换
-    3. 频繁更新浏览器 Cookie 和 reload 会触发小红书的风控机制
+    page_pool = None
+    if a1_refresher is not None:
+        a1_refresher.kill(block=False)
+        a1_refresher = None
     
-    因此采用新策略：
-    - 签名服务器启动时设置一次 Cookie（使用浏览器自带的 a1）
-    - 不再每次请求都更新 Cookie
-    - 用户请求时带上完整 Cookie 即可
-    """
-    global browser_context, context_page, global_a1
+    if playwright_instance:
+        try:
+            playwright_instance.stop()
+        except Exception as e:
+            logger.warning(f"关闭 playwright 失败: {e}")
     
-    # 重试最多 10 次（参考官方实现）
-    for attempt in range(10):
+    playwright_instance = None
+    browser = None
+    browser_context = None
+    sign_contexts = []
+    global_a1 = ""
+
+
+def evaluate_sign_script(script, arg, label):
+    """
+    在池中借出的页面上执行签名脚本，失败时按指数退避（带抖动）重试
+    label 仅用于日志
+    """
+    # 重试最多 SIGN_MAX_ATTEMPTS 次（参考官方实现为 10 次）
+    for attempt in range(SIGN_MAX_ATTEMPTS):
         try:
             # 执行签名函数（关键：不再频繁切换 Cookie！）
-            logger.info(f"[尝试 {attempt + 1}/10] 执行签名 - URI: {uri}")
-            encrypt_params = context_page.evaluate(
-                "([url, data]) => window._webmsxyw(url, data)",
-                [uri, data]
-            )
-            
-            # 详细日志：记录原始返回值
-            logger.info(f"[尝试 {attempt + 1}/10] 原始返回值: {encrypt_params}")
-            logger.info(f"[尝试 {attempt + 1}/10] 返回值类型: {type(encrypt_params)}")
-            logger.info(f"[尝试 {attempt + 1}/10] 返回值键: {encrypt_params.keys() if isinstance(encrypt_params, dict) else 'N/A'}")
-            
-            # 检查返回值
-            if not isinstance(encrypt_params, dict):
-                raise Exception(f"签名函数返回值不是字典: {type(encrypt_params)}")
-            
-            # 提取字段（注意大小写！）
-            x_s = encrypt_params.get("X-s") or encrypt_params.get("x-s") or ""
-            x_t = encrypt_params.get("X-t") or encrypt_params.get("x-t") or ""
-            
-            if not x_s:
-                logger.warning(f"[尝试 {attempt + 1}/10] ⚠️ x-s 字段为空")
-            if not x_t:
-                logger.warning(f"[尝试 {attempt + 1}/10] ⚠️ x-t 字段为空")
-            
-            # 返回结果
-            result = {
-                "x-s": x_s,
-                "x-t": str(x_t)
-            }
+            # 热路径日志一律使用 %-style 延迟格式化，DEBUG 未开启时不产生格式化开销
+            logger.debug("[尝试 %d/%d] 执行签名 - %s", attempt + 1, SIGN_MAX_ATTEMPTS, label)
+            # 从池中借出一个页面，用完立即归还，避免并发请求互相阻塞
+            context, page = page_pool.get()
+            try:
+                encrypt_params = page.evaluate(script, arg)
+            finally:
+                page_pool.put((context, page))
             
-            logger.info(f"[尝试 {attempt + 1}/10] ✅ 签名生成成功")
-            logger.info(f"   x-s: {x_s[:50] if x_s else '(空)'}...")
-            logger.info(f"   x-t: {x_t}")
+            # 详细日志：记录原始返回值（仅 DEBUG）
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[尝试 %d/%d] 原始返回值: %r", attempt + 1, SIGN_MAX_ATTEMPTS, encrypt_params)
             
-            return result
+            return encrypt_params
             
         except Exception as e:
             # 这儿有时会出现 window._webmsxyw is not a function 或未知跳转错误
             # 因此加一个失败重试（官方注释）
             error_msg = str(e)
-            logger.warning(f"[尝试 {attempt + 1}/10] ❌ 签名生成失败: {error_msg}")
+            logger.warning("[尝试 %d/%d] ❌ 签名生成失败: %s", attempt + 1, SIGN_MAX_ATTEMPTS, error_msg)
             
             # 如果是最后一次尝试，抛出异常
-            if attempt == 9:
-                logger.error(f"重试了 10 次还是无法签名成功")
-                raise Exception(f"签名失败（重试10次）: {error_msg}")
+            if attempt == SIGN_MAX_ATTEMPTS - 1:
+                logger.error("重试了 %d 次还是无法签名成功", SIGN_MAX_ATTEMPTS)
+                raise Exception(f"签名失败（重试{SIGN_MAX_ATTEMPTS}次）: {error_msg}")
             
-            # 否则继续重试
-            logger.info(f"等待 0.5 秒后重试...")
-            time.sleep(0.5)
+            # 否则按指数退避（带抖动）后继续重试
+            delay = min(SIGN_RETRY_MAX_DELAY, SIGN_RETRY_BASE_DELAY * (2 ** attempt))
+            delay *= 0.5 + random.random()
+            logger.debug("等待 %.2f 秒后重试...", delay)
+            time.sleep(delay)
     
     # 理论上不会到这里
     raise Exception("重试了这么多次还是无法签名成功")
 
+
+def generate_sign(uri, data, a1, web_session, web_id=None):
+    """
+    生成签名（参考官方 basic_usage.py 实现）
+    参考：https://github.com/ReaJason/xhs
+    
+    重要发现：
+    1. 官方签名函数不使用 a1/web_session 参数，签名只依赖 uri 和 data
+    2. 官方建议：签名服务使用固定的 Cookie，不要频繁切换
+    3. 频繁更新浏览器 Cookie 和 reload 会触发小红书的风控机制
+    
+    因此采用新策略：
+    - 签名服务器启动时设置一次 Cookie（使用浏览器自带的 a1）
+    - 不再每次请求都更新 Cookie
+    - 用户请求时带上完整 Cookie 即可
+    - 相同 (uri, data) 的签名结果会缓存 SIGN_CACHE_TTL 秒
+    - 相同 (uri, data) 的并发请求只计算一次
+    """
+    cache_key = sign_cache_key(uri, data)
+    with sign_cache_lock:
+        generation = a1_generation
+        in_flight_key = (generation, cache_key)
+        cached = sign_cache.get(cache_key)
+        if cached is None:
+            pending = sign_in_flight.get(in_flight_key)
+            is_leader = pending is None
+            if is_leader:
+                pending = sign_in_flight[in_flight_key] = AsyncResult()
+    
+    if cached is not None:
+        logger.debug("✅ 命中签名缓存 - URI: %s", uri)
+        return dict(cached)
+    
+    # 已有相同请求正在签名，等待它的结果
+    if not is_leader:
+        logger.debug("等待相同签名请求的结果 - URI: %s", uri)
+        try:
+            return dict(pending.get(timeout=SIGN_IN_FLIGHT_TIMEOUT))
+        except gevent.Timeout:
+            raise Exception(f"等待相同签名请求超时（{SIGN_IN_FLIGHT_TIMEOUT} 秒）")
+    
+    try:
+        # 字段大小写已在 SIGN_SCRIPT 中统一
+        result = evaluate_sign_script(SIGN_SCRIPT, [uri, data], uri)
+        
+        if not result["x-s"]:
+            logger.warning("⚠️ x-s 字段为空 - URI: %s", uri)
+        if not result["x-t"]:
+            logger.warning("⚠️ x-t 字段为空 - URI: %s", uri)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("✅ 签名生成成功 x-s: %s... x-t: %s",
+                         result["x-s"][:50] or '(空)', result["x-t"])
+        
+        if is_cacheable_sign(result):
+            with sign_cache_lock:
+                # 签名期间 a1 已轮换，结果按旧 a1 生成，不能写入新缓存
+                if generation == a1_generation:
+                    sign_cache[cache_key] = result
+        pending.set(result)
+    except BaseException as e:
+        # 包括 greenlet 被 kill 的情况，保证等待者不会一直挂起
+        pending.set_exception(e if isinstance(e, Exception) else Exception("签名请求被中断"))
+        raise
+    finally:
+        with sign_cache_lock:
+            sign_in_flight.pop(in_flight_key, None)
+    
+    return dict(result)
+
+
+def generate_sign_batch(items):
+    """
+    批量生成签名：items 为 [(uri, data), ...]
+    未命中缓存的条目合并到一次 page.evaluate 中计算，N 次 CDP 往返变为 1 次
+    """
+    cache_keys = [sign_cache_key(uri, data) for uri, data in items]
+    results = [None] * len(items)
+    
+    with sign_cache_lock:
+        generation = a1_generation
+        for idx, cache_key in enumerate(cache_keys):
+            cached = sign_cache.get(cache_key)
+            if cached is not None:
+                results[idx] = dict(cached)
+    
+    missing = [idx for idx, result in enumerate(results) if result is None]
+    if missing:
+        signed = evaluate_sign_script(
+            SIGN_BATCH_SCRIPT,
+            [[items[idx][0], items[idx][1]] for idx in missing],
+            f"批量签名 {len(missing)} 条"
+        )
+        
+        with sign_cache_lock:
+            for idx, result in zip(missing, signed):
+                if generation == a1_generation and is_cacheable_sign(result):
+                    sign_cache[cache_keys[idx]] = result
+                results[idx] = dict(result)
+    
+    logger.debug("✅ 批量签名完成: %d 条，命中缓存 %d 条", len(items), len(items) - len(missing))
+    return results
+
 @app.route('/web_a1', methods=['GET'])
 def web_a1():
     logger.info(f"✅ 签名端a1转发成功: {global_a1}")
-    return jsonify({'web_a1': global_a1})
+    return ojsonify({'web_a1': global_a1})
+
+
+# 首页内容完全静态，启动时序列化一次
+INDEX_BODY = orjson.dumps({
+    'service': 'XHS Signature Server',
+    'description': '小红书 API 签名服务',
+    'status': 'running',
+    'version': '1.0.0',
+    'endpoints': {
+        'health': {
+            'path': '/health',
+            'method': 'GET',
+            'description': '健康检查'
+        },
+        'sign': {
+            'path': '/sign',
+            'method': 'POST',
+            'description': '生成签名'
+        },
+        'sign_batch': {
+            'path': '/sign_batch',
+            'method': 'POST',
+            'description': '批量生成签名'
+        }
+    }
+})
+
+# 健康检查只有 status/browser_ready/a1/timestamp 会变化，其余部分预先拼好
+HEALTH_TEMPLATE = b'{"status":"%s","browser_ready":%s,"a1":%s,"timestamp":%f}'
+
 
 @app.route('/', methods=['GET'])
 def index():
     """首页 - API 信息"""
-    return jsonify({
-        'service': 'XHS Signature Server',
-        'description': '小红书 API 签名服务',
-        'status': 'running',
-        'version': '1.0.0',
-        'endpoints': {
-            'health': {
-                'path': '/health',
-                'method': 'GET',
-                'description': '健康检查'
-            },
-            'sign': {
-                'path': '/sign',
-                'method': 'POST',
-                'description': '生成签名'
-            }
-        }
-    })
+    return app.response_class(INDEX_BODY, mimetype="application/json")
 
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """健康检查接口"""
-    browser_ready = context_page is not None
+    browser_ready = page_pool is not None
     
-    return jsonify({
-        'status': 'healthy' if browser_ready else 'initializing',
-        'browser_ready': browser_ready,
-        'a1': global_a1[:20] + "..." if global_a1 else "",
-        'timestamp': time.time()
-    }), 200 if browser_ready else 503
+    body = HEALTH_TEMPLATE % (
+        b'healthy' if browser_ready else b'initializing',
+        b'true' if browser_ready else b'false',
+        orjson.dumps(global_a1[:20] + "..." if global_a1 else ""),
+        time.time()
+    )
+    return app.response_class(body, status=200 if browser_ready else 503, mimetype="application/json")
 
 
-@app.route("/sign", methods=["POST"])
-def sign_endpoint():
+def handle_sign(json_data):
     """
-    生成小红书 API 签名
+    生成小红书 API 签名，返回 (响应体, 状态码)
     参考：https://github.com/ReaJason/xhs
+    只通过 WSGI 快速通道（FAST_ROUTES）访问
     """
     try:
-        # 获取请求数据
-        json_data = request.get_json()
+        ensure_browser()
+        
         if not json_data:
             logger.error("请求体为空")
-            return jsonify({
+            return {
                 'error': 'Request body is required',
                 'success': False
-            }), 400
+            }, 400
+        if not isinstance(json_data, dict):
+            logger.error("请求体不是 JSON 对象")
+            return {
+                'error': 'Request body must be a JSON object',
+                'success': False
+            }, 400
         
         uri = json_data.get('uri', '')
         data = json_data.get('data')
@@ -315,55 +713,174 @@ def sign_endpoint():
         # 验证必需参数
         if not uri:
             logger.error("缺少 uri 参数")
-            return jsonify({
+            return {
                 'error': 'uri parameter is required',
                 'success': False
-            }), 400
+            }, 400
+        if not isinstance(uri, str):
+            logger.error("uri 参数不是字符串")
+            return {
+                'error': 'uri parameter must be a string',
+                'success': False
+            }, 400
         
         # 记录请求信息
-        logger.info(f"收到签名请求:")
-        logger.info(f"  - URI: {uri}")
-        logger.info(f"  - 有 data: {bool(data)}")
+        logger.debug("收到签名请求 - URI: %s, 有 data: %s", uri, bool(data))
         
         # 生成签名
         result = generate_sign(uri, data, a1, web_session, web_id)
         
-        logger.info(f"✅ 签名请求处理成功")
-        return jsonify(result)
+        # 每个请求只保留一行 INFO 日志
+        logger.info("✅ 签名请求处理成功 - URI: %s", uri)
+        return result, 200
         
     except Exception as e:
-        logger.error(f"❌ 签名请求处理失败: {e}", exc_info=True)
-        return jsonify({
+        log_request_error("❌ 签名请求处理失败", e)
+        return {
             'error': str(e),
             'error_type': type(e).__name__,
             'success': False,
             'hint': '即便做了重试，还是有可能会遇到签名失败的情况，请重试'
-        }), 500
+        }, 500
+
+
+def handle_sign_batch(json_data):
+    """
+    批量生成签名（一次浏览器调用完成多条签名），返回 (响应体, 状态码)
+    只通过 WSGI 快速通道（FAST_ROUTES）访问
+    请求体: {"items": [{"uri": ..., "data": ...}, ...]}
+    """
+    try:
+        ensure_browser()
+        
+        items = json_data.get('items') if isinstance(json_data, dict) else None
+        if not isinstance(items, list) or not items:
+            logger.error("缺少 items 参数")
+            return {
+                'error': 'items parameter is required',
+                'success': False
+            }, 400
+        
+        if len(items) > SIGN_BATCH_MAX_ITEMS:
+            logger.error(f"批量签名条目过多: {len(items)}")
+            return {
+                'error': f'too many items (max {SIGN_BATCH_MAX_ITEMS})',
+                'success': False
+            }, 400
+        
+        # 验证必需参数
+        pairs = []
+        for idx, item in enumerate(items):
+            uri = item.get('uri', '') if isinstance(item, dict) else ''
+            if not uri:
+                logger.error(f"第 {idx} 条缺少 uri 参数")
+                return {
+                    'error': f'items[{idx}].uri parameter is required',
+                    'success': False
+                }, 400
+            if not isinstance(uri, str):
+                logger.error(f"第 {idx} 条 uri 参数不是字符串")
+                return {
+                    'error': f'items[{idx}].uri parameter must be a string',
+                    'success': False
+                }, 400
+            pairs.append((uri, item.get('data')))
+        
+        # 生成签名
+        results = generate_sign_batch(pairs)
+        
+        logger.info("✅ 批量签名请求处理成功 - %d 条", len(results))
+        return {'results': results}, 200
+        
+    except Exception as e:
+        log_request_error("❌ 批量签名请求处理失败", e)
+        return {
+            'error': str(e),
+            'error_type': type(e).__name__,
+            'success': False,
+            'hint': '即便做了重试，还是有可能会遇到签名失败的情况，请重试'
+        }, 500
 
 
 @app.route("/a1", methods=["GET"])
 def get_a1():
     """获取当前浏览器的 a1 值"""
-    return jsonify({'a1': global_a1})
+    return ojsonify({'a1': global_a1})
 
 
 @app.errorhandler(404)
 def not_found(e):
     """404 错误处理"""
-    return jsonify({
+    return ojsonify({
         'error': 'Endpoint not found',
-        'available_endpoints': ['/', '/health', '/sign', '/a1']
-    }), 404
+        'available_endpoints': ['/', '/health', '/sign', '/sign_batch', '/a1']
+    }, 404)
 
 
 @app.errorhandler(500)
 def internal_error(e):
     """500 错误处理"""
     logger.error(f"Internal server error: {e}")
-    return jsonify({
+    return ojsonify({
         'error': 'Internal server error',
         'message': str(e)
-    }), 500
+    }, 500)
+
+
+# 高频接口走 WSGI 快速通道，绕过 Flask 的 URL 匹配、before_request 和错误处理链
+FAST_ROUTES = {
+    ('POST', '/sign'): handle_sign,
+    ('POST', '/sign_batch'): handle_sign_batch,
+}
+# 快速通道路径 -> 允许的方法，方法不对时返回 405（而不是落到 Flask 的 404）
+FAST_ROUTE_METHODS = {
+    path: [m for m, p in FAST_ROUTES if p == path]
+    for _, path in FAST_ROUTES
+}
+
+
+def read_json_body(environ):
+    """读取并解析请求体 JSON，请求体为空或不是合法 JSON 时返回 None"""
+    length = environ.get('CONTENT_LENGTH')
+    stream = environ['wsgi.input']
+    body = stream.read(int(length)) if length else stream.read()
+    if not body:
+        return None
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def json_response(start_response, body, status, headers=()):
+    """快速通道的 JSON 响应"""
+    payload = orjson.dumps(body)
+    start_response(f"{status} {HTTPStatus(status).phrase}", [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(payload))),
+        *headers,
+    ])
+    return [payload]
+
+
+def application(environ, start_response):
+    """
+    WSGI 入口：FAST_ROUTES 中的接口直接分发，其余低频接口交给 Flask
+    部署时必须使用 application 而不是 app，否则 /sign、/sign_batch 不可用
+    """
+    path = environ.get('PATH_INFO', '')
+    handler = FAST_ROUTES.get((environ['REQUEST_METHOD'], path))
+    if handler is None:
+        allowed_methods = FAST_ROUTE_METHODS.get(path)
+        if allowed_methods is None:
+            return app(environ, start_response)
+        return json_response(start_response, {
+            'error': 'Method not allowed',
+            'allowed_methods': allowed_methods
+        }, 405, [('Allow', ', '.join(allowed_methods))])
+    
+    body, status = handler(read_json_body(environ))
+    return json_response(start_response, body, status)
 
 
 if __name__ == '__main__':
@@ -385,7 +902,7 @@ if __name__ == '__main__':
     # 启动服务器
     # 使用 gevent 提高并发性能
     logger.info(f"正在启动 HTTP 服务器...")
-    server = pywsgi.WSGIServer(('0.0.0.0', port), app, log=logger)
+    server = pywsgi.WSGIServer(('0.0.0.0', port), application, log=logger)
     
     logger.info("=" * 60)
     logger.info(f"✅ 服务器启动成功！")
@@ -398,6 +915,5 @@ if __name__ == '__main__':
         server.serve_forever()
     except KeyboardInterrupt:
         logger.info("收到停止信号，正在关闭服务器...")
-        if playwright_instance:
-            playwright_instance.stop()
+        close_browser()
         logger.info("服务器已关闭")